@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Build one TensorRT engine that runs both detectors in a single pass.
+
+The COCO and face checkpoints share the same CSP backbone, so serving them
+as two engines pays the backbone FLOPs (and one set of launch costs) twice
+per image. This script exports both models to ONNX, grafts the face
+model's detection head onto the object model's backbone with
+onnx-graphsurgeon, and compiles the merged two-output graph with trtexec.
+One forward pass then produces both heads' outputs, which the server can
+demux into the "objects" and "faces" sections.
+
+Offline tooling: run on the serving GPU (engines are arch-specific). The
+merge forces both heads onto one shared input resolution, so detectors
+that serve at different imgsz trade a little face recall for the shared
+backbone. app.py still loads two engines until its raw-TensorRT path can
+consume a multi-output engine.
+
+Usage:
+    python build_fused_engine.py --obj yolov8n.pt --face /models/yolov8n-face.pt \
+        --imgsz 640 --out merged.engine
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+import onnx
+import onnx_graphsurgeon as gs
+from ultralytics import YOLO
+
+
+def export_onnx(weights: str, imgsz: int, batch: int) -> str:
+    return YOLO(weights).export(format="onnx", imgsz=imgsz, batch=batch,
+                                dynamic=False, simplify=True)
+
+
+def same_node(a: gs.Node, b: gs.Node) -> bool:
+    if a.op != b.op or [t.shape for t in a.outputs] != [t.shape for t in b.outputs]:
+        return False
+    # Same op and shapes isn't enough: head branches can mirror each other
+    # shape-for-shape (e.g. the box-regression convs, 4*reg_max channels in
+    # both models) while carrying different trained weights, so the actual
+    # constant values have to match for a node to count as shared.
+    for ta, tb in zip(a.inputs, b.inputs):
+        const_a = isinstance(ta, gs.Constant)
+        if const_a != isinstance(tb, gs.Constant):
+            return False
+        if const_a and not np.array_equal(ta.values, tb.values):
+            return False
+    return True
+
+
+def merge(obj_path: str, face_path: str, merged_path: str) -> None:
+    obj = gs.import_onnx(onnx.load(obj_path))
+    face = gs.import_onnx(onnx.load(face_path))
+
+    # The two exports share an identical backbone topology: walk the node
+    # lists in tandem and cut at the first divergence. Everything past the
+    # cut in the face graph is its head.
+    cut = 0
+    for a, b in zip(obj.nodes, face.nodes):
+        if not same_node(a, b):
+            break
+        cut += 1
+    if cut == 0:
+        raise SystemExit("models share no backbone prefix; nothing to fuse")
+    if cut == len(face.nodes):
+        raise SystemExit("graphs are identical end to end; nothing to graft")
+
+    # Rewire the face head onto the object backbone's tensors; the face
+    # copy of the backbone (and its weights) is dropped by cleanup().
+    # Everything else on the face side — intermediates AND weight/constant
+    # tensors — gets a face_ prefix: both exports name their head
+    # initializers identically (model.22.*), and colliding names would be
+    # collapsed to a single initializer on export, leaving one head running
+    # with the other's weights.
+    remap = {f.name: o for o, f in zip(
+        (t for n in obj.nodes[:cut] for t in n.outputs),
+        (t for n in face.nodes[:cut] for t in n.outputs))}
+
+    def rename(t):
+        if t.name and not t.name.startswith("face_"):
+            t.name = "face_" + t.name
+        return t
+
+    for node in face.nodes[cut:]:
+        node.inputs = [remap[t.name] if t.name in remap else rename(t)
+                       for t in node.inputs]
+        for t in node.outputs:
+            rename(t)
+        obj.nodes.append(node)
+    obj.outputs.extend(face.outputs)
+
+    obj.cleanup().toposort()
+    onnx.save(gs.export_onnx(obj), merged_path)
+    print(f"[fuse] shared {cut} backbone nodes; merged graph -> {merged_path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fuse the object and face detectors into one TensorRT engine.")
+    ap.add_argument("--obj", default=os.environ.get("OBJ_WEIGHTS", "yolov8n.pt"))
+    ap.add_argument("--face", default=os.environ.get("FACE_WEIGHTS", "/models/yolov8n-face.pt"))
+    ap.add_argument("--imgsz", type=int, default=640, help="Shared input resolution for both heads")
+    ap.add_argument("--batch", type=int, default=int(os.environ.get("MAX_BATCH", "16")))
+    ap.add_argument("--out", default="merged.engine")
+    args = ap.parse_args()
+
+    obj_onnx = export_onnx(args.obj, args.imgsz, args.batch)
+    face_onnx = export_onnx(args.face, args.imgsz, args.batch)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merged = os.path.join(tmp, "merged.onnx")
+        merge(obj_onnx, face_onnx, merged)
+        subprocess.run(["trtexec", f"--onnx={merged}", "--fp16",
+                        f"--saveEngine={args.out}"], check=True)
+    print(f"[fuse] engine written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()